@@ -1,7 +1,8 @@
 # Include Python's Socket Library
 from socket import *
-from prtp_packet import PRTPPacket
-import threading
+from prtp_packet import PRTPPacket, FLAG_ACK, FLAG_FIN
+from prtp_mmsg import sendmmsg
+import selectors
 import time
 import sys
 
@@ -13,13 +14,15 @@ class GoBackNSender:
     # - AIMD congestion control (Additive Increase, Multiplicative Decrease)
     # - Flow control via receiver advertised window
     
-    def __init__(self, window_size=5, timeout=2.0):
+    def __init__(self, window_size=5, timeout=2.0, debug=False, max_retries=10):
         """
         Initialize Go-Back-N Sender
         
         Args:
             window_size: Initial maximum number of unacknowledged packets
             timeout: Timeout interval in seconds
+            debug: Print a log line for every packet sent, ACKed, or retransmitted
+            max_retries: Consecutive timeouts without an ACK before giving up
         """
         self.socket = socket(AF_INET, SOCK_DGRAM)
         self.socket.settimeout(0.1)  # Non-blocking for ACK reception
@@ -27,6 +30,9 @@ class GoBackNSender:
         # Go-Back-N parameters
         self.max_window_size = window_size  # Maximum allowed window
         self.timeout = timeout
+        self.max_retries = max_retries
+        self._retries = 0  # Consecutive timeouts since the window last moved
+        self.debug = debug  # Per-packet logging (off by default: formatting + stdout I/O per packet is costly)
         self.MSS = PRTPPacket.MAX_DATA_SIZE  # Maximum Segment Size
         
         # Sequence numbers
@@ -34,30 +40,62 @@ class GoBackNSender:
         self.next_seq_num = 0  # Next packet to send
         
         # Packet storage for retransmission
-        self.send_buffer = {}  # {seq_num: (packet, timestamp)}
+        self.wire_packets = []  # Serialized packets of the current transfer, indexed by seq_num - first_seq
+        self.first_seq = 0  # Sequence number of wire_packets[0]
+        # Ring buffer of send timestamps for unacknowledged packets, indexed by
+        # seq_num & buffer_mask (None = free slot). Sized to the max window rounded
+        # up to a power of two, so in-flight packets never share a slot.
+        self.N = 1 << (window_size - 1).bit_length()
+        self.buffer_mask = self.N - 1
+        self.send_buffer = [None] * self.N
+        
+        # Cap on unacknowledged packets held for retransmission: stays below the
+        # receiver's maximum buffer so repeated timeouts can't pile up more data
+        # than the peer could ever accept
+        self.MAX_BUFFER_SIZE = 65535  # Receiver maximum buffer (in bytes)
+        self.retx_cap = max(1, min(self.max_window_size, self.MAX_BUFFER_SIZE // self.MSS - 2))
         
         # Connection state
         self.connected = False
         self.peer_addr = None
         
         # ---- CONGESTION CONTROL (AIMD) ----
-        self.cwnd = 1.0  # Congestion window (in packets)
-        self.ssthresh = 16.0  # Slow start threshold (in packets)
+        # Windows are kept in 24.8 fixed point (1/256 packet units) so the ACK and
+        # send paths only do integer arithmetic; see the cwnd/ssthresh properties
+        self.cwnd_fp = 1 << 8  # Congestion window (1 packet)
+        self.ssthresh_fp = 16 << 8  # Slow start threshold (16 packets)
         self.state = 'slow_start'  # States: 'slow_start', 'congestion_avoidance'
         
+        # Fast retransmit: 3 duplicate ACKs resend the unACKed window right away
+        # instead of waiting for the timeout
+        self._last_ack_num = None  # Most recent cumulative ACK number received
+        self._dupack_count = 0  # Consecutive duplicates of _last_ack_num
+        
+        # ACK progress reporting (see _handle_ack)
+        self._acks_since_log = 0  # Packets ACKed since the last report
+        self._last_log = 0.0  # time.monotonic() of the last report
+        
         # ---- FLOW CONTROL ----
         self.receiver_window = 65535  # Receiver advertised window (in bytes)
         
-        # Threading
-        self.running = False
-        self.ack_thread = None
-        self.timer_thread = None
-        self.lock = threading.Lock()
+        # Event loop: sending and ACK processing share one thread, driven by a
+        # selector on the socket, so no locking is needed
+        self.selector = None
         
-        # Timer
+        # Timer (monotonic clock; checked by the sender while it waits for ACKs)
         self.timer_running = False
         self.timer_start = None
     
+    @property
+    def cwnd(self):
+        # Congestion window in packets (for logging)
+        return self.cwnd_fp / 256
+    
+    @property
+    def ssthresh(self):
+        # Slow start threshold in packets (for logging)
+        return self.ssthresh_fp / 256
+    
     # ---- CONNECTION-ORIENTED ----
     def connect(self, host, port):
         """Establish connection using 3-way handshake (SYN -> SYN-ACK -> ACK)"""
@@ -107,13 +145,15 @@ class GoBackNSender:
             self.base = ack_packet.seq_num
             self.next_seq_num = ack_packet.seq_num
             
-            # Return to non-blocking mode for data transfer
-            self.socket.settimeout(0.1)
+            # Fix the peer on the socket: data packets go out with send() and the
+            # kernel skips per-call destination address handling
+            self.socket.connect(self.peer_addr)
             
-            # Start ACK receiver thread
-            self.running = True
-            self.ack_thread = threading.Thread(target=self._receive_acks, daemon=True)
-            self.ack_thread.start()
+            # Switch to non-blocking mode for data transfer; send_data sleeps in
+            # the selector until an ACK arrives or the timer is due
+            self.socket.setblocking(False)
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.socket, selectors.EVENT_READ)
             
             print(f"[HANDSHAKE] Connection established!")
             print(f"[CLIENT SENDER] Initial cwnd: {self.cwnd} packets, Slow Start Threshold: {self.ssthresh} packets")
@@ -138,177 +178,289 @@ class GoBackNSender:
             raise Exception("Not connected")
         
         # Split data into chunks (max 1024 bytes per packet)
+        # memoryview slices reference the caller's buffer instead of copying each chunk
         max_chunk_size = PRTPPacket.MAX_DATA_SIZE
-        chunks = [data[i:i+max_chunk_size] for i in range(0, len(data), max_chunk_size)]
+        payload = memoryview(data)
+        chunks = [payload[i:i+max_chunk_size] for i in range(0, len(data), max_chunk_size)]
         
         total_packets = len(chunks)
         print(f"[CLIENT SENDER] Sending {len(data)} bytes in {total_packets} packets")
         
-        chunk_index = 0
+        # Build every packet of the transfer once up front; sending and
+        # retransmitting are then pure socket I/O
+        # Sequence numbers continue from the handshake rather than restarting at 0
+        self.first_seq = self.next_seq_num
+        end_seq = self.first_seq + total_packets
+        self.wire_packets = [
+            PRTPPacket(
+                seq_num=self.first_seq + i,
+                ack_num=0,
+                flags=PRTPPacket.FLAG_ACK,
+                data=chunk
+            ).serialize()
+            for i, chunk in enumerate(chunks)
+        ]
         
-        # while oldest unack-ed packet seq num is less than total packets
-        while self.base < total_packets:
-            # lock thread to prevent race conditions with other threads, i.e. recieve_acks()
-            with self.lock:
-                # Calculate effective window (min of congestion window and flow control window)
-                # Convert receiver window from bytes to packets
-                receiver_window_packets = self.receiver_window / self.MSS
-                effective_window = min(int(self.cwnd), int(receiver_window_packets), self.max_window_size)
+        # Bind attributes used on every packet to locals for the loop below
+        wire_packets = self.wire_packets
+        send_buffer = self.send_buffer
+        mask = self.buffer_mask
+        first_seq = self.first_seq
+        retx_cap = self.retx_cap
+        monotonic = time.monotonic
+        
+        # while oldest unack-ed packet seq num is less than the end of this transfer
+        while self.base < end_seq:
+            # Calculate effective window (min of congestion window and flow control window)
+            # Convert receiver window from bytes to packets
+            receiver_window_packets = self.receiver_window / self.MSS
+            effective_window = min(self.cwnd_fp >> 8, int(receiver_window_packets), self.max_window_size)
+            
+            # Send packets within effective window (and the retransmission cap)
+            base = self.base
+            seq = self.next_seq_num
+            limit = min(end_seq, base + effective_window, base + retx_cap)
+            if seq < limit:
+                # The burst is a slice of the prebuilt packets
+                burst = wire_packets[seq - first_seq:limit - first_seq]
                 
-                # Send packets within effective window
-                while self.next_seq_num < total_packets and \
-                      self.next_seq_num < self.base + effective_window:
-                    
-                    # Create packet
-                    packet = PRTPPacket(
-                        seq_num=self.next_seq_num,
-                        ack_num=0,
-                        flags=PRTPPacket.FLAG_ACK,
-                        data=chunks[self.next_seq_num]
-                    )
-                    
-                    # Send packet
-                    self.socket.sendto(packet.serialize(), self.peer_addr)
+                # Store send times for potential retransmission
+                now = monotonic()
+                for s in range(seq, limit):
+                    send_buffer[s & mask] = now
+                
+                if self.debug:
+                    for s in range(seq, limit):
+                        print(f"[CLIENT SENDER] Sent packet {s} "
+                              f"(cwnd={self.cwnd:.2f}, rwnd={receiver_window_packets:.1f}, "
+                              f"effective={effective_window}")
+                
+                # Start timer if this is the first packet in window
+                if base == seq:
+                    self._start_timer()
+                
+                self.next_seq_num = limit
+                
+                # Hand the whole burst to the kernel in one system call
+                sendmmsg(self.socket, burst)
             
+            # Wait until ACKs arrive or the retransmission timer is due,
+            # then process every queued ACK
+            if self.base < end_seq and self.selector.select(timeout=self._remaining()):
+                self._drain_acks()
+            
+            # Check for timeout
+            if self.timer_running and self.base < end_seq:
+                if self._remaining() <= 0:
+                    # Receiver unreachable: stop instead of retransmitting forever
+                    self._retries += 1
+                    if self._retries > self.max_retries:
+                        raise ConnectionError(f"No ACK for packet {self.base} after "
+                                              f"{self.max_retries} retransmissions")
                     
-                    print(f"[CLIENT SENDER] Sent packet {self.next_seq_num} "
-                          f"(cwnd={self.cwnd:.2f}, rwnd={receiver_window_packets:.1f}, "
-                          f"effective={effective_window}")
-                    
-                    # Store for potential retransmission
-                    self.send_buffer[self.next_seq_num] = (packet, time.time())
+                    # Congestion detected, initiate retransmission
+                    print(f"[CLIENT SENDER] TIMEOUT! Retransmitting packets from {self.base}")
                     
-                    # Start timer if this is the first packet in window
-                    if self.base == self.next_seq_num:
-                        self._start_timer()
+                    # ---- CONGESTION CONTROL: Multiplicative Decrease (MD) ----
+                    # AIMD: On timeout, halve cwnd and reset to slow start
+                    self.ssthresh_fp = max(self.cwnd_fp >> 1, 2 << 8)
+                    self.cwnd_fp = 1 << 8  # Reset to 1 packet
+                    self.state = 'slow_start'
+                    print(f"[CONGESTION] TIMEOUT! Multiplicative Decrease: "
+                          f"cwnd={self.cwnd:.2f}, ssthresh={self.ssthresh:.2f}")
                     
-                    self.next_seq_num += 1
-            
-            # Wait a bit for ACKs
-            time.sleep(0.01)
-            
-            # Check for timeout
-            with self.lock:
-                if self.timer_running and self.base < total_packets:
-                    elapsed = time.time() - self.timer_start
-                    if elapsed >= self.timeout:
-                        # Congestion detected, initiate retransmission
-                        print(f"[CLIENT SENDER] TIMEOUT! Retransmitting packets from {self.base}")
-                        
-                        # ---- CONGESTION CONTROL: Multiplicative Decrease (MD) ----
-                        # AIMD: On timeout, halve cwnd and reset to slow start
-                        self.ssthresh = max(self.cwnd / 2, 2.0)
-                        self.cwnd = 1.0  # Reset to 1 packet
-                        self.state = 'slow_start'
-                        print(f"[CONGESTION] TIMEOUT! Multiplicative Decrease: "
-                              f"cwnd={self.cwnd:.2f}, ssthresh={self.ssthresh:.2f}")
-                        
-                        # Retransmit all packets in window (Go-Back-N)
-                        self._retransmit_window()
-                        self._start_timer()
-        
+                    # Retransmit all packets in window (Go-Back-N)
+                    self._retransmit_window()
+                    self._start_timer()
+    
         print(f"[CLIENT SENDER] All {total_packets} packets acknowledged!")
+        self._send_fin()
         return len(data)
     
-    def _receive_acks(self):
-        # Background thread to receive ACKs
-        while self.running:
+    def _send_fin(self):
+        # End the transfer: FIN takes the sequence number after the last data
+        # packet and the receiver ACKs it like data. All data is already ACKed,
+        # so if no ACK comes back after max_retries the FIN is simply abandoned
+        fin_seq = self.next_seq_num
+        fin = PRTPPacket(seq_num=fin_seq, flags=FLAG_FIN).serialize()
+        for _ in range(self.max_retries + 1):
+            self.socket.send(fin)
+            deadline = time.monotonic() + self.timeout
+            while self.selector.select(timeout=max(0.0, deadline - time.monotonic())):
+                while True:
+                    try:
+                        data = self.socket.recv(PRTPPacket.MAX_PACKET_SIZE)
+                    except BlockingIOError:
+                        break  # Socket drained
+                    except OSError as e:
+                        print(f"[CLIENT SENDER] Error receiving ACK: {e}")
+                        break
+                    ack_packet = PRTPPacket.deserialize(data)
+                    if ack_packet and ack_packet.flags & FLAG_ACK and ack_packet.ack_num == fin_seq:
+                        self.base = self.next_seq_num = fin_seq + 1
+                        print(f"[CLIENT SENDER] FIN {fin_seq} acknowledged")
+                        return True
+                if time.monotonic() >= deadline:
+                    break
+        print(f"[CLIENT SENDER] No ACK for FIN {fin_seq}, closing anyway")
+        return False
+    
+    def _drain_acks(self):
+        # Receive and handle every ACK queued on the (non-blocking) socket
+        while True:
             try:
-                data, addr = self.socket.recvfrom(PRTPPacket.MAX_PACKET_SIZE)
-                ack_packet = PRTPPacket.deserialize(data)
-                
-                if ack_packet and ack_packet.has_flag(PRTPPacket.FLAG_ACK):
-                    self._handle_ack(ack_packet)
-            except timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    print(f"[CLIENT SENDER] Error receiving ACK: {e}")
+                data = self.socket.recv(PRTPPacket.MAX_PACKET_SIZE)
+            except BlockingIOError:
+                break  # Socket drained
+            except OSError as e:
+                print(f"[CLIENT SENDER] Error receiving ACK: {e}")
+                break
+            ack_packet = PRTPPacket.deserialize(data)
+            
+            if ack_packet and ack_packet.flags & FLAG_ACK:
+                self._handle_ack(ack_packet)
     
     def _handle_ack(self, ack_packet):
         # Handle received ACK (cumulative) with AIMD congestion control
         # In Go-Back-N, ACK n means all packets up to and including n are received
 
-        with self.lock:
-            ack_num = ack_packet.ack_num
+        ack_num = ack_packet.ack_num
+        
+        # ---- FLOW CONTROL: Extract receiver window from ACK ----
+        self.receiver_window = ack_packet.window_size if ack_packet.window_size > 0 else 65535
+        
+        # ---- FAST RETRANSMIT: count duplicate ACKs ----
+        if ack_num == self._last_ack_num:
+            self._dupack_count += 1
+        else:
+            self._last_ack_num = ack_num
+            self._dupack_count = 0
+        
+        if self._dupack_count == 3 and self.base < self.next_seq_num:
+            # Receiver keeps re-ACKing the packet before base: base was lost.
+            # The Go-Back-N receiver discarded everything sent after it, so
+            # resend the whole unACKed window now and go to fast recovery
+            # instead of waiting for the timeout
+            print(f"[CLIENT SENDER] 3 duplicate ACKs! Fast retransmit from packet {self.base}")
+            self.ssthresh_fp = max(self.cwnd_fp >> 1, 2 << 8)
+            self.cwnd_fp = self.ssthresh_fp
+            self.state = 'congestion_avoidance'
+            print(f"[CONGESTION] Fast recovery: cwnd={self.cwnd:.2f}, ssthresh={self.ssthresh:.2f}")
+            self._retransmit_window()
+            self._start_timer()
+        
+        if ack_num >= self.base:
+            # Count how many NEW packets are acknowledged
+            newly_acked = ack_num - self.base + 1
+            self._retries = 0
             
-            # ---- FLOW CONTROL: Extract receiver window from ACK ----
-            self.receiver_window = ack_packet.window_size if ack_packet.window_size > 0 else 65535
+            # Remove acknowledged packets from buffer with slice stores
+            # rather than one store per packet
+            send_buffer = self.send_buffer
+            size = self.N
+            if newly_acked >= size:
+                send_buffer[:] = [None] * size
+            else:
+                mask = self.buffer_mask
+                lo = self.base & mask
+                hi = (ack_num + 1) & mask
+                if lo < hi:
+                    send_buffer[lo:hi] = [None] * (hi - lo)
+                else:
+                    # Acked range wraps around the end of the ring
+                    send_buffer[lo:] = [None] * (size - lo)
+                    send_buffer[:hi] = [None] * hi
             
-            if ack_num >= self.base:
-                # Count how many NEW packets are acknowledged
-                newly_acked = ack_num - self.base + 1
-                
-                print(f"[CLIENT SENDER] Received ACK {ack_num} (cumulative, +{newly_acked} new, rwnd={self.receiver_window}B)")
-                
-                # Remove acknowledged packets from buffer
-                for seq in range(self.base, ack_num + 1):
-                    if seq in self.send_buffer:
-                        del self.send_buffer[seq]
-                
-                # ---- CONGESTION CONTROL: Update cwnd using AIMD ----
-                if self.state == 'slow_start':
-                    # Slow Start: Increase cwnd by 1 for each ACK (exponential growth)
-                    self.cwnd += newly_acked
-                    
-                    if self.cwnd >= self.ssthresh:
-                        self.state = 'congestion_avoidance'
-                        print(f"[CONGESTION] Entering congestion avoidance (cwnd={self.cwnd:.2f}, ssthresh={self.ssthresh:.2f})")
-                    else:
-                        print(f"[CONGESTION] Slow start: cwnd={self.cwnd:.2f} (ssthresh={self.ssthresh:.2f})")
+            # ---- CONGESTION CONTROL: Update cwnd using AIMD ----
+            if self.state == 'slow_start':
+                # Slow Start: Increase cwnd by 1 for each ACK (exponential growth)
+                self.cwnd_fp += newly_acked << 8
                 
-                elif self.state == 'congestion_avoidance':
-                    # Congestion Avoidance: Additive Increase (AI)
-                    # Increase cwnd by 1/cwnd for each ACK (linear growth)
-                    self.cwnd += (newly_acked / self.cwnd)
-                    print(f"[CONGESTION] Congestion avoidance: cwnd={self.cwnd:.2f} (AI)")
-                
-                # Slide window forward
-                self.base = ack_num + 1
-                
-                # Restart timer if there are still unacknowledged packets
-                if self.base < self.next_seq_num:
-                    self._start_timer()
-                else:
-                    self._stop_timer()
+                if self.cwnd_fp >= self.ssthresh_fp:
+                    self.state = 'congestion_avoidance'
+                    print(f"[CONGESTION] Entering congestion avoidance (cwnd={self.cwnd:.2f}, ssthresh={self.ssthresh:.2f})")
+            
+            elif self.state == 'congestion_avoidance':
+                # Congestion Avoidance: Additive Increase (AI)
+                # Increase cwnd by 1/cwnd for each ACK (linear growth)
+                self.cwnd_fp += max(1, (newly_acked << 16) // self.cwnd_fp)
+            
+            # Progress report: one line per 64 ACKed packets or per 100 ms
+            # (every ACK in debug mode) rather than a print per ACK
+            self._acks_since_log += newly_acked
+            now = time.monotonic()
+            if self.debug or self._acks_since_log >= 64 or now - self._last_log > 0.1:
+                print(f"[CLIENT SENDER] ACKed through {ack_num} (+{self._acks_since_log} packets), "
+                      f"cwnd={self.cwnd:.2f} ({self.state}), ssthresh={self.ssthresh:.2f}, "
+                      f"rwnd={self.receiver_window}B")
+                self._acks_since_log = 0
+                self._last_log = now
+            
+            # Slide window forward
+            self.base = ack_num + 1
+            
+            # Restart timer if there are still unacknowledged packets
+            if self.base < self.next_seq_num:
+                self._start_timer()
+            else:
+                self._stop_timer()
     
     def _retransmit_window(self):
         # Retransmit all packets in current window (Go-Back-N behavior)
+        burst = []
+        append = burst.append
+        send_buffer = self.send_buffer
+        wire_packets = self.wire_packets
+        mask = self.buffer_mask
+        first_seq = self.first_seq
+        debug = self.debug
+        now = time.monotonic()
         for seq_num in range(self.base, self.next_seq_num):
-            if seq_num in self.send_buffer:
-                packet, _ = self.send_buffer[seq_num]
-                self.socket.sendto(packet.serialize(), self.peer_addr)
-                self.send_buffer[seq_num] = (packet, time.time())
-                print(f"[CLIENT SENDER] Retransmitted packet {seq_num}")
+            slot = seq_num & mask
+            if send_buffer[slot] is not None:
+                append(wire_packets[seq_num - first_seq])
+                send_buffer[slot] = now
+                if debug:
+                    print(f"[CLIENT SENDER] Retransmitted packet {seq_num}")
+        if burst:
+            sendmmsg(self.socket, burst)
     
     def _start_timer(self):
         # Start/restart the timeout timer
         self.timer_running = True
-        self.timer_start = time.time()
+        self.timer_start = time.monotonic()
     
     def _stop_timer(self):
         # Stop the timeout timer
         self.timer_running = False
         self.timer_start = None
     
+    def _remaining(self):
+        # Seconds until the retransmission timer expires (a full interval if it is not running)
+        if not self.timer_running:
+            return self.timeout
+        return max(0.0, self.timeout - (time.monotonic() - self.timer_start))
+    
     def close(self):
         # Close connection
-        self.running = False
-        if self.ack_thread:
-            self.ack_thread.join(timeout=1.0)
+        if self.selector:
+            self.selector.close()
         self.socket.close()
         print("[GBN SENDER] Connection closed")
 
 
 
 # Main client function
-if len(sys.argv) < 3:
-    print("Usage: python3 WebClientUDP.py <host> <port> [max_window_size]")
+args = [arg for arg in sys.argv[1:] if arg != '--debug']
+debug = len(args) != len(sys.argv) - 1  # --debug enables per-packet logging
+
+if len(args) < 2:
+    print("Usage: python3 WebClientUDP.py <host> <port> [max_window_size] [--debug]")
     sys.exit(1)
 
-serverName = sys.argv[1]
-serverPort = int(sys.argv[2])
-max_window_size = int(sys.argv[3]) if len(sys.argv) > 3 else 64  # Larger default for AIMD
+serverName = args[0]
+serverPort = int(args[1])
+max_window_size = int(args[2]) if len(args) > 2 else 64  # Larger default for AIMD
 
 print("=" * 60)
 print("Go-Back-N Client with Flow & Congestion Control (AIMD)")
@@ -316,7 +468,7 @@ print("=" * 60)
 
 try:
     # Create Go-Back-N sender with flow & congestion control
-    sender = GoBackNSender(window_size=max_window_size, timeout=2.0)
+    sender = GoBackNSender(window_size=max_window_size, timeout=2.0, debug=debug)
     
     # Connect to server
     if sender.connect(serverName, serverPort):
@@ -328,9 +480,9 @@ try:
         print("-" * 60)
         
         # Send data using Go-Back-N with AIMD
-        start_time = time.time()
+        start_time = time.monotonic()
         bytes_sent = sender.send_data(message.encode('utf-8'))
-        end_time = time.time()
+        end_time = time.monotonic()
         
         print("-" * 60)
         print(f"[CLIENT] Successfully sent {bytes_sent} bytes")
@@ -338,9 +490,6 @@ try:
         print(f"[CLIENT] Final cwnd: {sender.cwnd:.2f} packets")
         print(f"[CLIENT] Final state: {sender.state}")
         
-        # Wait a bit for final ACKs
-        time.sleep(0.5)
-        
         # Close connection
         sender.close()
     else:
@@ -349,6 +498,9 @@ try:
 
 except KeyboardInterrupt:
     print("\n[CLIENT] Interrupted by user")
+except ConnectionError as e:
+    print(f"[CLIENT] Connection lost: {e}")
+    sys.exit(1)
 except Exception as e:
     print(f"[CLIENT] Error: {e}")
     import traceback
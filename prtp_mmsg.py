@@ -0,0 +1,211 @@
+"""
+Batched datagram I/O for Pipelined Reliable Transfer Protocol
+"""
+
+import ctypes
+import errno
+import functools
+import socket
+import struct
+import sys
+
+# ---- ctypes mirrors of the Linux structs used by sendmmsg(2)/recvmmsg(2) ----
+
+class _IOVec(ctypes.Structure):
+    # struct iovec
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    # struct msghdr
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),  # socklen_t
+                ('msg_iov', ctypes.POINTER(_IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+class _MMsgHdr(ctypes.Structure):
+    # struct mmsghdr
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+
+def _load_libc_func(name, argtypes):
+    # Look up a libc function (Linux only), None if unavailable
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        func = getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = argtypes
+    func.restype = ctypes.c_int
+    return func
+
+_sendmmsg = _load_libc_func('sendmmsg', [ctypes.c_int, ctypes.POINTER(_MMsgHdr),
+                                         ctypes.c_uint, ctypes.c_int])
+_recvmmsg = _load_libc_func('recvmmsg', [ctypes.c_int, ctypes.c_void_p,
+                                         ctypes.c_uint, ctypes.c_int, ctypes.c_void_p])
+
+_SOCKADDR_IN_SIZE = 16
+
+
+@functools.lru_cache(maxsize=16)
+def _sockaddr_in(addr):
+    # Pack a (host, port) tuple into a raw struct sockaddr_in
+    host, port = addr
+    return (struct.pack('=H', socket.AF_INET) +
+            struct.pack('!H', port) +
+            socket.inet_aton(socket.gethostbyname(host)) +
+            bytes(8))
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_sockaddr_in(raw):
+    # Unpack a raw struct sockaddr_in into a (host, port) tuple like recvfrom's
+    return (socket.inet_ntoa(raw[4:8]), struct.unpack_from('!H', raw, 2)[0])
+
+
+def _send_each(sock, datagrams, addr):
+    # Portable fallback: one send/sendto call per datagram
+    # When the send buffer stays full (a non-blocking socket, or one whose
+    # timeout runs out), the remaining datagrams are dropped as the network
+    # would; the sender's retransmission timer recovers them
+    for i, datagram in enumerate(datagrams):
+        try:
+            if addr is None:
+                sock.send(datagram)
+            else:
+                sock.sendto(datagram, addr)
+        except (BlockingIOError, socket.timeout):
+            return i
+    return len(datagrams)
+
+
+def sendmmsg(sock, datagrams, addr=None):
+    # Send a batch of datagrams with a single sendmmsg(2) system call
+    # Falls back to a per-datagram sendto loop on platforms without sendmmsg
+
+    # Args:
+    #     sock: UDP socket (AF_INET)
+    #     datagrams: list of bytes objects, one per datagram
+    #     addr: destination (host, port), or None if the socket is connected
+
+    # Returns:
+    #     int: Number of datagrams sent
+
+    count = len(datagrams)
+    if _sendmmsg is None or count < 2:
+        return _send_each(sock, datagrams, addr)
+
+    if addr is None:
+        name, namelen = None, 0
+    else:
+        raw = _sockaddr_in(addr)
+        name, namelen = ctypes.cast(raw, ctypes.c_void_p), len(raw)
+
+    iovecs = (_IOVec * count)()
+    msgs = (_MMsgHdr * count)()
+    for i, datagram in enumerate(datagrams):
+        iovecs[i].iov_base = ctypes.cast(datagram, ctypes.c_void_p)
+        iovecs[i].iov_len = len(datagram)
+        hdr = msgs[i].msg_hdr
+        hdr.msg_name = name
+        hdr.msg_namelen = namelen
+        hdr.msg_iov = ctypes.pointer(iovecs[i])
+        hdr.msg_iovlen = 1
+
+    sent = _sendmmsg(sock.fileno(), msgs, count, 0)
+    if sent < 0:
+        err = ctypes.get_errno()
+        if err not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+            raise OSError(err, 'sendmmsg: ' + errno.errorcode.get(err, str(err)))
+        sent = 0
+
+    # Kernel accepted only part of the batch (e.g. send buffer full): retry
+    # the rest through sendto, which waits for room up to the socket's timeout
+    if sent < count:
+        sent += _send_each(sock, datagrams[sent:], addr)
+    return sent
+
+
+class RecvBatch:
+    # Preallocated buffers for draining several datagrams per recvmmsg(2) call
+    # Falls back to one recvfrom_into per batch on platforms without recvmmsg
+
+    def __init__(self, count, bufsize):
+        # Args:
+        #     count: Maximum number of datagrams per batch
+        #     bufsize: Size of each datagram buffer
+        self.count = count
+        self.buffers = [bytearray(bufsize) for _ in range(count)]
+        self.sizes = [0] * count  # bytes received into each buffer
+        self.addrs = [None] * count  # sender address of each datagram
+
+        # The kernel-facing structs stay pinned to the same buffers for the
+        # lifetime of the batch, so a receive builds nothing per call
+        self._pins = [(ctypes.c_char * bufsize).from_buffer(buf) for buf in self.buffers]
+        self._names = (ctypes.c_char * (_SOCKADDR_IN_SIZE * count))()
+        self._iovecs = (_IOVec * count)()
+        self._msgs = (_MMsgHdr * count)()
+        names_base = ctypes.addressof(self._names)
+        for i, pin in enumerate(self._pins):
+            self._iovecs[i].iov_base = ctypes.addressof(pin)
+            self._iovecs[i].iov_len = bufsize
+            hdr = self._msgs[i].msg_hdr
+            hdr.msg_name = names_base + i * _SOCKADDR_IN_SIZE
+            hdr.msg_namelen = _SOCKADDR_IN_SIZE
+            hdr.msg_iov = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def swap(self, i, buf):
+        # Put a fresh buffer into slot i and hand back the one it replaces, so a
+        # received datagram can be passed on without copying it out
+        
+        # Args:
+        #     i: Slot index
+        #     buf: bytearray of at least the batch's buffer size
+        
+        # Returns:
+        #     bytearray: The buffer previously in slot i
+        
+        old = self.buffers[i]
+        pin = (ctypes.c_char * len(buf)).from_buffer(buf)
+        self._pins[i] = pin
+        self._iovecs[i].iov_base = ctypes.addressof(pin)
+        self.buffers[i] = buf
+        return old
+
+    def recv(self, sock):
+        # Receive a batch of datagrams from an AF_INET UDP socket
+        # Waits for the first datagram like recvfrom (honouring the socket's
+        # timeout, so socket.timeout propagates), then takes whatever else is
+        # already queued without blocking
+
+        # Returns:
+        #     int: Number of datagrams received into buffers[0:n]
+
+        self.sizes[0], self.addrs[0] = sock.recvfrom_into(self.buffers[0])
+        if _recvmmsg is None or self.count < 2:
+            return 1
+
+        msgs = self._msgs
+        got = _recvmmsg(sock.fileno(), ctypes.addressof(msgs) + ctypes.sizeof(_MMsgHdr),
+                        self.count - 1, socket.MSG_DONTWAIT, None)
+        if got < 0:
+            err = ctypes.get_errno()
+            if err not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                raise OSError(err, 'recvmmsg: ' + errno.errorcode.get(err, str(err)))
+            return 1
+
+        names = self._names.raw
+        for i in range(1, got + 1):
+            hdr = msgs[i].msg_hdr
+            self.sizes[i] = msgs[i].msg_len
+            offset = i * _SOCKADDR_IN_SIZE
+            self.addrs[i] = _parse_sockaddr_in(names[offset:offset + _SOCKADDR_IN_SIZE])
+            hdr.msg_namelen = _SOCKADDR_IN_SIZE  # the kernel overwrites it
+        return got + 1
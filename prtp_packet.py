@@ -3,7 +3,32 @@ Defines the packet structure for Pipelined Reliable Transfer Protocol
 """
 
 import struct
+import threading
 import time
+import zlib
+
+# Flag constants (module level so hot paths can test flags without class lookups)
+FLAG_SYN = 0x01
+FLAG_ACK = 0x02
+FLAG_FIN = 0x04
+FLAG_RST = 0x08
+
+# Coarse packet timestamp: [packets stamped, current value]. The clock is read
+# once per 64 packets rather than once per packet
+_TS_CACHE = [0, 0]
+
+def packet_timestamp():
+    # Millisecond timestamp (mod 2^32) for a header, refreshed every 64 calls
+    count = _TS_CACHE[0]
+    _TS_CACHE[0] = count + 1
+    if count & 63 == 0:
+        _TS_CACHE[1] = (time.monotonic_ns() // 1000000) & 0xFFFFFFFF
+    return _TS_CACHE[1]
+
+# Per-thread serialize() scratch buffer: a single mutable buffer shared at
+# class level would let two threads serializing at once overwrite each other
+_TX_LOCAL = threading.local()
+
 
 class PRTPPacket:
     # PRTP Packet Structure (20 bytes header + data):
@@ -12,9 +37,10 @@ class PRTPPacket:
     # - Sequence Number (4 bytes, unsigned int)
     # - Acknowledgment Number (4 bytes, unsigned int)
     # - Receiver Window Size (2 bytes, unsigned short)
-    # - Checksum (2 bytes, unsigned short)
     # - Flags (1 byte): SYN, ACK, FIN, RST
-    # - Reserved (3 bytes)
+    # - Reserved (1 byte)
+    # - Checksum (4 bytes, unsigned int): CRC-32 of the payload followed by
+    #   the other 16 header bytes
     # - Timestamp (4 bytes, unsigned int, milliseconds)
     
     # Flags:
@@ -25,14 +51,23 @@ class PRTPPacket:
 
     
     HEADER_SIZE = 20
+    _HDR = struct.Struct('!IIHBBII')  # Precompiled header layout (avoids re-parsing the format per call)
+    _U32 = struct.Struct('!I')  # checksum / timestamp field
+    _CHECKSUM_OFFSET = 12
+    _ACK_OFFSET = 4
+    _ACK_WINDOW = struct.Struct('!IH')  # ack number + window, at _ACK_OFFSET
+    _FLAGS_OFFSET = 10
+    _TIMESTAMP_OFFSET = 16
+    _CRC_FIELDS = struct.Struct('!IIHBBI')  # the header minus its checksum field
+    _FULL_PACKET = struct.Struct('!IIHBBII1024s')  # header + MAX_DATA_SIZE payload
     MAX_DATA_SIZE = 1024  # Maximum payload size
     MAX_PACKET_SIZE = HEADER_SIZE + MAX_DATA_SIZE
     
     # Flag constants
-    FLAG_SYN = 0x01
-    FLAG_ACK = 0x02
-    FLAG_FIN = 0x04
-    FLAG_RST = 0x08
+    FLAG_SYN = FLAG_SYN
+    FLAG_ACK = FLAG_ACK
+    FLAG_FIN = FLAG_FIN
+    FLAG_RST = FLAG_RST
     
     def __init__(self, seq_num=0, ack_num=0, window_size=0, flags=0, data=b''):
         # Initialize a PRTP packet
@@ -48,8 +83,10 @@ class PRTPPacket:
         self.window_size = window_size
         self.flags = flags
         self.data = data
-        self.timestamp = int(time.time() * 1000) % (2**32)  # milliseconds, mod 2^32
+        self.timestamp = packet_timestamp()  # milliseconds, mod 2^32
         self.checksum = 0
+        self._cached_checksum = 0   # CRC-32 of the payload...
+        self._cached_data = None    # ...while data is still this bytes object
     
     def set_flag(self, flag):
         # Set a specific flag
@@ -62,36 +99,67 @@ class PRTPPacket:
     def calculate_checksum(self):
         
         # Calculate checksum for the packet
-        # Uses Internet checksum algorithm (16-bit one's complement)
+        # Uses CRC-32 (zlib, table/hardware accelerated) over the payload and
+        # then the header without its checksum field
         
         # Create header with checksum = 0
-        header = struct.pack('!IIHHBBBBI',
-                            self.seq_num,
-                            self.ack_num,
-                            self.window_size,
-                            0,  # checksum placeholder
-                            self.flags,
-                            0,  # reserved byte 1
-                            0,  # reserved byte 2
-                            0,  # reserved byte 3
-                            self.timestamp)
-        
-        # Combine header and data
-        packet = header + self.data
+        header = self._HDR.pack(self.seq_num,
+                                self.ack_num,
+                                self.window_size,
+                                self.flags,
+                                0,  # reserved byte
+                                0,  # checksum placeholder
+                                self.timestamp)
+        return self._header_crc(header, self._payload_crc())
+    
+    def calculate_checksum_ref(self):
         
-        # Calculate checksum
-        checksum = 0
-        # Process 16-bit words
-        for i in range(0, len(packet), 2):
-            if i + 1 < len(packet):
-                word = (packet[i] << 8) + packet[i + 1]
-            else:
-                word = packet[i] << 8
-            checksum += word
-            checksum = (checksum & 0xFFFF) + (checksum >> 16)
+        # Reference checksum: plain bit-at-a-time CRC-32 (reflected polynomial
+        # 0xEDB88320) over the same bytes as calculate_checksum. Far too slow
+        # for the data path; tests/test_prtp_packet.py checks serialize and
+        # deserialize against it
         
-        # One's complement
-        return ~checksum & 0xFFFF
+        header = self._HDR.pack(self.seq_num, self.ack_num, self.window_size,
+                                self.flags, 0, 0, self.timestamp)
+        crc = 0xFFFFFFFF
+        for byte in (bytes(self.data) + header[:self._CHECKSUM_OFFSET]
+                     + header[self._CHECKSUM_OFFSET + 4:]):
+            crc ^= byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ (0xEDB88320 & -(crc & 1))
+        return crc ^ 0xFFFFFFFF
+    
+    def _payload_crc(self):
+        # CRC-32 of the payload, cached while data is the same bytes object, so a
+        # retransmission or any header change only re-covers the 16 header bytes.
+        # Mutable payloads (bytearray, memoryview) can change in place without
+        # the object changing, so their CRC is recomputed on every call
+        # The payload goes to zlib in one piece: since 1.2.12 its crc32 already
+        # runs several independent CRC streams over interleaved words ("braided"),
+        # and splitting it up in Python would only add per-call overhead
+        data = self.data
+        if type(data) is not bytes:
+            return zlib.crc32(data)
+        if self._cached_data is not data:
+            self._cached_checksum = zlib.crc32(data)
+            self._cached_data = data
+        return self._cached_checksum
+    
+    @staticmethod
+    def _header_crc(header, crc):
+        # Continue a payload CRC over the header, skipping the checksum field
+        header = memoryview(header)
+        crc = zlib.crc32(header[:PRTPPacket._CHECKSUM_OFFSET], crc)
+        return zlib.crc32(header[PRTPPacket._CHECKSUM_OFFSET + 4:PRTPPacket.HEADER_SIZE], crc)
+    
+    @staticmethod
+    def _tx_buf():
+        # This thread's MAX_PACKET_SIZE scratch buffer, created on first use
+        try:
+            return _TX_LOCAL.buf
+        except AttributeError:
+            buf = _TX_LOCAL.buf = bytearray(PRTPPacket.MAX_PACKET_SIZE)
+            return buf
     
     def serialize(self):
         # Serialize packet to bytes for transmission
@@ -99,22 +167,79 @@ class PRTPPacket:
         # Returns:
         #     bytes: Serialized packet
 
-        # Calculate checksum
-        self.checksum = self.calculate_checksum()
+        if len(self.data) == self.MAX_DATA_SIZE:
+            return self._serialize_full()
+        
+        # Build in this thread's scratch buffer and copy out once, so the only
+        # allocation per packet is the returned bytes object
+        buf = PRTPPacket._tx_buf()
+        if self.HEADER_SIZE + len(self.data) > len(buf):
+            buf = bytearray(self.HEADER_SIZE + len(self.data))  # oversized payload
+        length = self.serialize_into(buf)
+        with memoryview(buf) as view:
+            return bytes(view[:length])
+    
+    def _serialize_full(self):
+        # serialize() for the dominant shape, a full MAX_DATA_SIZE payload: the
+        # checksum is computed up front from the fields, so the packet is packed
+        # once with no patching and copied out without slicing
+        seq_num, ack_num, window_size, flags, timestamp, data = (
+            self.seq_num, self.ack_num, self.window_size, self.flags, self.timestamp, self.data)
+        checksum = zlib.crc32(
+            self._CRC_FIELDS.pack(seq_num, ack_num, window_size, flags, 0, timestamp),
+            self._payload_crc())
+        self.checksum = checksum
+        
+        if type(data) is bytes:
+            return self._FULL_PACKET.pack(seq_num, ack_num, window_size, flags, 0,
+                                          checksum, timestamp, data)
+        buf = PRTPPacket._tx_buf()  # exactly MAX_PACKET_SIZE long
+        self._HDR.pack_into(buf, 0, seq_num, ack_num, window_size, flags, 0,
+                            checksum, timestamp)
+        buf[self.HEADER_SIZE:] = data
+        return bytes(buf)
+    
+    def serialize_into(self, buf):
+        # Serialize packet in place into a caller-provided buffer
+        
+        # Args:
+        #     buf: Writable buffer (e.g. a pooled bytearray) of at least
+        #          HEADER_SIZE + len(data) bytes
         
-        # Pack header
-        header = struct.pack('!IIHHBBBBI',
+        # Returns:
+        #     int: Number of bytes written
+
+        # Pack header directly into the buffer, then copy the payload after it
+        self._HDR.pack_into(buf, 0,
                             self.seq_num,
                             self.ack_num,
                             self.window_size,
-                            self.checksum,
                             self.flags,
-                            0,  # reserved byte 1
-                            0,  # reserved byte 2
-                            0,  # reserved byte 3
+                            0,  # reserved byte
+                            0,  # checksum placeholder
                             self.timestamp)
+        length = self.HEADER_SIZE + len(self.data)
+        buf[self.HEADER_SIZE:length] = self.data
+        
+        # Calculate checksum from the packed header and fill it in
+        self.checksum = self._header_crc(buf, self._payload_crc())
+        self._U32.pack_into(buf, self._CHECKSUM_OFFSET, self.checksum)
         
-        return header + self.data
+        return length
+    
+    @staticmethod
+    def refresh_template(buf, ack_num, window_size, timestamp):
+        # Rewrite the ack number, window and timestamp of a serialized
+        # header-only packet (e.g. a prebuilt ACK) in place and reseal its
+        # checksum, instead of constructing and serializing a new packet
+        
+        # Args:
+        #     buf: bytearray holding exactly one serialized packet with no payload
+        
+        PRTPPacket._ACK_WINDOW.pack_into(buf, PRTPPacket._ACK_OFFSET, ack_num, window_size)
+        PRTPPacket._U32.pack_into(buf, PRTPPacket._TIMESTAMP_OFFSET, timestamp)
+        PRTPPacket._U32.pack_into(buf, PRTPPacket._CHECKSUM_OFFSET,
+                                       PRTPPacket._header_crc(buf, 0))
     
     @staticmethod
     def deserialize(packet_bytes):
@@ -122,7 +247,8 @@ class PRTPPacket:
         # Deserialize bytes to PRTP packet
         
         # Args:
-        #     packet_bytes: Raw packet bytes
+        #     packet_bytes: Raw packet bytes, or a memoryview of them; the
+        #                   payload is then a view too (no copy)
             
         # Returns:
         #     PRTPPacket: Deserialized packet or None if invalid
@@ -132,27 +258,29 @@ class PRTPPacket:
         
         # Unpack header
         try:
-            seq_num, ack_num, window_size, checksum, flags, _, _, _, timestamp = \
-                struct.unpack('!IIHHBBBBI', packet_bytes[:PRTPPacket.HEADER_SIZE])
+            seq_num, ack_num, window_size, flags, _, checksum, timestamp = \
+                PRTPPacket._HDR.unpack_from(packet_bytes, 0)
         except struct.error:
             return None
         
-        # Extract data
+        # Verify checksum straight from the datagram, without rebuilding the header
         data = packet_bytes[PRTPPacket.HEADER_SIZE:]
-        
-        # Create packet
-        packet = PRTPPacket(seq_num, ack_num, window_size, flags, data)
-        packet.timestamp = timestamp
-        
-        # Verify checksum
-        received_checksum = checksum
-        packet.checksum = 0
-        calculated_checksum = packet.calculate_checksum()
-        
-        if received_checksum != calculated_checksum:
+        data_crc = zlib.crc32(data)
+        if PRTPPacket._header_crc(packet_bytes, data_crc) != checksum:
             return None  # Checksum mismatch
         
-        packet.checksum = received_checksum
+        # Create packet without going through __init__ (every field comes
+        # from the wire)
+        packet = PRTPPacket.__new__(PRTPPacket)
+        packet.seq_num = seq_num
+        packet.ack_num = ack_num
+        packet.window_size = window_size
+        packet.flags = flags
+        packet.data = data
+        packet.timestamp = timestamp
+        packet.checksum = checksum
+        packet._cached_checksum = data_crc
+        packet._cached_data = data
         return packet
     
     def __str__(self):
@@ -170,3 +298,61 @@ class PRTPPacket:
         return (f"PRTPPacket(seq={self.seq_num}, ack={self.ack_num}, "
                 f"win={self.window_size}, flags={','.join(flags_str) or 'NONE'}, "
                 f"data_len={len(self.data)})")
+
+
+class PRTPView:
+    # Zero-copy, read-only view of a serialized PRTP packet
+    # Header fields are decoded from the underlying buffer only when accessed,
+    # so a receiver that needs just seq_num and data pays for nothing else.
+    # The attribute names match PRTPPacket, so a view can stand in for one.
+
+    __slots__ = ('_buf',)
+
+    def __init__(self, buf):
+        # Args:
+        #     buf: Datagram as bytes or a memoryview (e.g. of a pooled buffer);
+        #          the view is only valid while that buffer is not reused
+        self._buf = buf
+
+    def verify(self):
+        # Check the length and checksum, as deserialize does
+        
+        # Returns:
+        #     bool: True if the datagram is a valid PRTP packet
+        buf = self._buf
+        if len(buf) < PRTPPacket.HEADER_SIZE:
+            return False
+        crc = PRTPPacket._header_crc(buf, zlib.crc32(buf[PRTPPacket.HEADER_SIZE:]))
+        return crc == self.checksum
+
+    @property
+    def seq_num(self):
+        return PRTPPacket._U32.unpack_from(self._buf, 0)[0]
+
+    @property
+    def ack_num(self):
+        return PRTPPacket._ACK_WINDOW.unpack_from(self._buf, PRTPPacket._ACK_OFFSET)[0]
+
+    @property
+    def window_size(self):
+        return PRTPPacket._ACK_WINDOW.unpack_from(self._buf, PRTPPacket._ACK_OFFSET)[1]
+
+    @property
+    def flags(self):
+        return self._buf[PRTPPacket._FLAGS_OFFSET]
+
+    @property
+    def checksum(self):
+        return PRTPPacket._U32.unpack_from(self._buf, PRTPPacket._CHECKSUM_OFFSET)[0]
+
+    @property
+    def timestamp(self):
+        return PRTPPacket._U32.unpack_from(self._buf, PRTPPacket._TIMESTAMP_OFFSET)[0]
+
+    @property
+    def data(self):
+        return self._buf[PRTPPacket.HEADER_SIZE:]
+
+    def has_flag(self, flag):
+        # Check if a specific flag is set
+        return (self.flags & flag) != 0
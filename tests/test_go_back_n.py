@@ -0,0 +1,122 @@
+"""
+End-to-end Go-Back-N transfers between WebClientUDP.py and GoBackNReceiver
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from prtp_packet import PRTPPacket, FLAG_SYN, FLAG_ACK
+from WebServerUDP import GoBackNReceiver
+
+
+class LossyPathTest(unittest.TestCase):
+
+    def run_transfer(self, message, drop_seqs, input_delay=0.0):
+        # Run the client script against an in-process receiver that drops the
+        # first arrival of each sequence number in drop_seqs; the message is
+        # typed input_delay seconds after the client starts
+        # Returns: (bytes received, client stdout, client wall time)
+        receiver = GoBackNReceiver(0, idle_timeout=0.5)
+        port = receiver.socket.getsockname()[1]
+        deliver = receiver.handle_incoming_frame
+        pending_drops = set(drop_seqs)
+
+        def lossy(packet):
+            if packet.seq_num in pending_drops:
+                pending_drops.discard(packet.seq_num)
+                return  # lost on the way
+            deliver(packet)
+        receiver.handle_incoming_frame = lossy
+
+        result = {}
+        def serve():
+            if receiver.listen():
+                result['data'] = receiver.receive()
+        server = threading.Thread(target=serve, daemon=True)
+        server.start()
+        try:
+            started = time.monotonic()
+            client = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, 'WebClientUDP.py'), '127.0.0.1', str(port), '64'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            time.sleep(input_delay)
+            stdout, stderr = client.communicate(message + '\n', timeout=60)
+            elapsed = time.monotonic() - started - input_delay
+            server.join(timeout=10)
+        finally:
+            receiver.close()
+
+        self.assertEqual(client.returncode, 0, stdout + stderr)
+        self.assertFalse(pending_drops, "dropped packets never arrived")
+        return result.get('data'), stdout, elapsed
+
+    def test_fast_retransmit_recovers_without_timeout(self):
+        # Packets after the lost one are discarded by the receiver; the
+        # duplicate ACKs for them must trigger a resend of the whole window
+        # well before the client's 2 s retransmission timeout
+        message = ''.join(chr(ord('a') + i % 26) for i in range(100 * 1024))
+        data, output, elapsed = self.run_transfer(message, drop_seqs={11})
+
+        self.assertEqual(data, message.encode())
+        self.assertIn('Fast retransmit', output)
+        self.assertNotIn('TIMEOUT', output)
+        self.assertLess(elapsed, 2.0)
+
+    def test_slow_input_does_not_end_the_transfer(self):
+        # The message is typed after the receiver's idle timeout has passed;
+        # the transfer still only ends on the client's FIN
+        data, output, _ = self.run_transfer('hello', drop_seqs=(), input_delay=1.0)
+
+        self.assertEqual(data, b'hello')
+        self.assertIn('FIN 2 acknowledged', output)
+
+
+class HandshakeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.receiver = GoBackNReceiver(0)
+        self.addr = ('127.0.0.1', self.receiver.socket.getsockname()[1])
+        self.client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.client.settimeout(5.0)
+
+    def tearDown(self):
+        self.client.close()
+        self.receiver.close()
+
+    def send(self, **fields):
+        self.client.sendto(PRTPPacket(**fields).serialize(), self.addr)
+
+    def test_data_packet_does_not_complete_handshake(self):
+        # The handshake ACK is lost and the first data packet (which also
+        # carries FLAG_ACK) arrives in its place: it must not be taken as the ACK
+        result = {}
+        server = threading.Thread(target=lambda: result.update(ok=self.receiver.listen()))
+        server.start()
+        self.send(flags=FLAG_SYN)
+        self.client.recv(PRTPPacket.MAX_PACKET_SIZE)  # SYN-ACK
+        self.send(seq_num=1, flags=FLAG_ACK, data=b'lost ack')
+        time.sleep(0.2)
+        self.assertNotIn('ok', result)  # still waiting for a SYN
+
+        self.send(flags=FLAG_SYN)
+        self.client.recv(PRTPPacket.MAX_PACKET_SIZE)
+        self.send(seq_num=1, ack_num=1, flags=FLAG_ACK)
+        server.join(timeout=5)
+        self.assertTrue(result.get('ok'))
+        self.assertEqual(self.receiver.expected_seq, 1)
+
+        # Out-of-order data before any delivery has no in-order packet to re-ACK
+        self.receiver.handle_incoming_frame(PRTPPacket(seq_num=2, flags=FLAG_ACK, data=b'x'))
+        self.assertEqual(self.receiver._ack_queue, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the batched datagram helpers in prtp_mmsg
+"""
+
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prtp_mmsg
+
+
+class FullSendBufferSocket:
+    # Stand-in socket whose send buffer fills up after `room` datagrams
+
+    def __init__(self, room, error):
+        self.room = room
+        self.error = error
+        self.sent = []
+
+    def sendto(self, datagram, addr):
+        if len(self.sent) >= self.room:
+            raise self.error
+        self.sent.append(datagram)
+
+
+class SendFallbackTest(unittest.TestCase):
+
+    def test_full_send_buffer_drops_the_rest_of_the_batch(self):
+        datagrams = [bytes([i]) * 8 for i in range(5)]
+        for error in (BlockingIOError(), socket.timeout()):
+            with self.subTest(error=type(error).__name__):
+                sock = FullSendBufferSocket(2, error)
+                sent = prtp_mmsg._send_each(sock, datagrams, ('127.0.0.1', 9))
+                self.assertEqual(sent, 2)
+                self.assertEqual(sock.sent, datagrams[:2])
+
+
+class BatchRoundTripTest(unittest.TestCase):
+
+    def test_sendmmsg_batch_arrives_through_recv_batch(self):
+        rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            rx.bind(('127.0.0.1', 0))
+            rx.settimeout(1.0)
+            tx.bind(('127.0.0.1', 0))
+            datagrams = [bytes([i]) * (i + 1) for i in range(20)]
+            self.assertEqual(prtp_mmsg.sendmmsg(tx, datagrams, rx.getsockname()), len(datagrams))
+
+            batch = prtp_mmsg.RecvBatch(32, 64)
+            received = []
+            while len(received) < len(datagrams):
+                count = batch.recv(rx)
+                for i in range(count):
+                    self.assertEqual(batch.addrs[i], tx.getsockname())
+                    received.append(bytes(batch.buffers[i][:batch.sizes[i]]))
+            self.assertEqual(received, datagrams)
+        finally:
+            rx.close()
+            tx.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Serialization and checksum tests for PRTPPacket / PRTPView
+"""
+
+import os
+import random
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prtp_packet import PRTPPacket, PRTPView, FLAG_ACK
+
+
+class ChecksumTest(unittest.TestCase):
+
+    def test_serialized_checksum_matches_reference_crc(self):
+        rng = random.Random(371)
+        lengths = [0, 1, 2, 3, 15, 16, 17, 255, 1023, PRTPPacket.MAX_DATA_SIZE]
+        for length in lengths:
+            for payload_type in (bytes, bytearray, memoryview):
+                with self.subTest(length=length, payload=payload_type.__name__):
+                    data = payload_type(rng.randbytes(length))
+                    packet = PRTPPacket(seq_num=rng.getrandbits(32), ack_num=rng.getrandbits(32),
+                                        window_size=rng.getrandbits(16), flags=rng.getrandbits(4),
+                                        data=data)
+                    wire = packet.serialize()
+                    self.assertEqual(len(wire), PRTPPacket.HEADER_SIZE + length)
+                    self.assertEqual(packet.checksum, packet.calculate_checksum_ref())
+                    self.assertEqual(packet.calculate_checksum(), packet.calculate_checksum_ref())
+
+                    received = PRTPPacket.deserialize(wire)
+                    self.assertIsNotNone(received)
+                    self.assertEqual(received.checksum, received.calculate_checksum_ref())
+                    self.assertEqual((received.seq_num, received.ack_num, received.window_size,
+                                      received.flags, bytes(received.data)),
+                                     (packet.seq_num, packet.ack_num, packet.window_size,
+                                      packet.flags, bytes(data)))
+
+    def test_corrupted_packet_is_rejected(self):
+        rng = random.Random(1071)
+        wire = PRTPPacket(seq_num=7, flags=FLAG_ACK, data=rng.randbytes(300)).serialize()
+        for i in range(len(wire)):
+            corrupted = bytearray(wire)
+            corrupted[i] ^= 1 << rng.randrange(8)
+            with self.subTest(byte=i):
+                self.assertIsNone(PRTPPacket.deserialize(bytes(corrupted)))
+
+    def test_payload_mutated_in_place_is_reserialized_with_fresh_checksum(self):
+        payload = bytearray(b'a' * 100)
+        packet = PRTPPacket(seq_num=1, flags=FLAG_ACK, data=payload)
+        self.assertIsNotNone(PRTPPacket.deserialize(packet.serialize()))
+
+        payload[0:5] = b'hello'
+        wire = packet.serialize()
+        received = PRTPPacket.deserialize(wire)
+        self.assertIsNotNone(received)
+        self.assertEqual(bytes(received.data), bytes(payload))
+
+        view = memoryview(payload)
+        packet.data = view
+        packet.serialize()
+        payload[-1:] = b'z'
+        self.assertIsNotNone(PRTPPacket.deserialize(packet.serialize()))
+
+    def test_concurrent_serialize_does_not_mix_packets(self):
+        # serialize() builds in a scratch buffer; threads must not share it
+        failures = []
+        start = threading.Barrier(4)
+
+        def worker(tag):
+            data = bytearray([tag]) * 500
+            full = bytearray([tag]) * PRTPPacket.MAX_DATA_SIZE
+            start.wait()
+            for seq in range(2000):
+                for payload in (data, full):
+                    received = PRTPPacket.deserialize(
+                        PRTPPacket(seq_num=seq, ack_num=tag, data=payload).serialize())
+                    if (received is None or received.seq_num != seq or received.ack_num != tag
+                            or bytes(received.data) != bytes(payload)):
+                        failures.append((tag, seq))
+                        return
+
+        threads = [threading.Thread(target=worker, args=(tag,)) for tag in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+
+
+class PRTPViewTest(unittest.TestCase):
+
+    def test_view_decodes_the_same_fields_as_deserialize(self):
+        packet = PRTPPacket(seq_num=0x01020304, ack_num=0xA0B0C0D0, window_size=4321,
+                            flags=FLAG_ACK, data=b'payload bytes')
+        wire = packet.serialize()
+        view = PRTPView(memoryview(wire))
+        received = PRTPPacket.deserialize(wire)
+
+        self.assertTrue(view.verify())
+        for field in ('seq_num', 'ack_num', 'window_size', 'flags', 'checksum', 'timestamp'):
+            self.assertEqual(getattr(view, field), getattr(received, field), field)
+        self.assertEqual(bytes(view.data), received.data)
+
+    def test_view_rejects_corrupt_and_short_datagrams(self):
+        wire = bytearray(PRTPPacket(seq_num=9, data=b'x' * 50).serialize())
+        wire[30] ^= 0x40
+        self.assertFalse(PRTPView(memoryview(wire)).verify())
+        self.assertFalse(PRTPView(b'short').verify())
+
+
+if __name__ == '__main__':
+    unittest.main()